@@ -4,6 +4,7 @@ modified: 2025/06/06
 """
 import os
 import glob
+import json
 import shutil
 import time
 import numpy as np
@@ -11,6 +12,54 @@ import open3d as o3d
 from pathlib import Path
 from sklearn.neighbors import KDTree
 
+# Every destructive operation on the source tree is appended here before it
+# is performed, so restore_original_structure can undo them in reverse.
+# The journal sits next to this script (the dataset root) and stores absolute
+# paths, so a rollback works no matter which directory it is called from.
+JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "MulSen_AD_journal.log")
+
+def journal_append(entry):
+    line = json.dumps(entry) + '\n'
+    with open(JOURNAL_PATH, 'ab+') as f:
+        # Start on a fresh line if a crash left the previous one torn
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                line = '\n' + line
+        f.write(line.encode())
+        f.flush()
+        os.fsync(f.fileno())
+
+def journal_record(op, src, dst=None):
+    entry = {"op": op, "src": os.path.abspath(str(src))}
+    if dst is not None:
+        entry["dst"] = os.path.abspath(str(dst))
+    journal_append(entry)
+
+def journaled_move(src, dst):
+    # Overwriting dst would lose a file the journal cannot bring back
+    if os.path.exists(str(dst)):
+        raise FileExistsError(f"Refusing to overwrite existing file: {dst}")
+    journal_record("move", src, dst)
+    shutil.move(str(src), str(dst))
+
+def journaled_rmdir(path):
+    journal_record("rmdir", path)
+    os.rmdir(str(path))
+
+def load_journal():
+    entries = []
+    if not os.path.exists(JOURNAL_PATH):
+        return entries
+    with open(JOURNAL_PATH, 'r') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # A torn line from a crash mid-write; its operation never ran.
+                continue
+    return entries
+
 def move_pointcloud_contents():
     for item in Path(".").iterdir():
         if item.is_dir():
@@ -19,9 +68,9 @@ def move_pointcloud_contents():
                 for pc_item in pointcloud_dir.iterdir():
                     destination = item / pc_item.name
                     if not destination.exists():
-                        shutil.move(str(pc_item), str(destination))
+                        journaled_move(pc_item, destination)
                 try:
-                    pointcloud_dir.rmdir()
+                    journaled_rmdir(pointcloud_dir)
                 except OSError:
                     pass
 
@@ -122,21 +171,21 @@ def reorganize_files():
         
         if gt_dir.exists():
             all_gt_files = []
-            for gt_subfolder in gt_dir.iterdir():
-                if gt_subfolder.is_dir():
-                    for gt_file in gt_subfolder.glob("*.txt"):
-                        if gt_file.is_file():
-                            all_gt_files.append(gt_file)
-                    try:
-                        gt_subfolder.rmdir()
-                    except OSError:
-                        pass
+            gt_subfolders = [d for d in gt_dir.iterdir() if d.is_dir()]
+            for gt_subfolder in gt_subfolders:
+                for gt_file in gt_subfolder.glob("*.txt"):
+                    if gt_file.is_file():
+                        all_gt_files.append(gt_file)
             
             all_gt_files.sort(key=lambda x: x.name)
             
             for i, gt_file in enumerate(all_gt_files, 1):
                 new_gt_name = "{}.txt".format(i)
-                shutil.move(str(gt_file), str(gt_dir / new_gt_name))
+                journaled_move(gt_file, gt_dir / new_gt_name)
+            
+            for gt_subfolder in gt_subfolders:
+                if not any(gt_subfolder.iterdir()):
+                    journaled_rmdir(gt_subfolder)
 
 def norm_pcd(point_cloud):
     center = np.average(point_cloud, axis=0)
@@ -498,7 +547,62 @@ def cleanup_intermediate_files():
             if os.path.exists(folder_path):
                 shutil.rmtree(folder_path)
 
+def restore_original_structure():
+    entries = load_journal()
+    if not entries:
+        if os.path.exists(JOURNAL_PATH):
+            os.remove(JOURNAL_PATH)
+        print("No journal found, nothing to restore")
+        return True
+    
+    # Rollback appends an "undone" marker after each step, so a replay after an
+    # interrupted rollback skips finished entries instead of guessing from the
+    # filesystem. Only the entry being undone at the crash can lack its marker,
+    # and it is then found in its original state.
+    operations = [entry for entry in entries if entry["op"] != "undone"]
+    undone = {entry["index"] for entry in entries if entry["op"] == "undone"}
+    
+    print(f"Restoring original structure from {len(operations) - len(undone)} journal entries...")
+    
+    restored = 0
+    for index in reversed(range(len(operations))):
+        if index in undone:
+            continue
+        entry = operations[index]
+        src = entry["src"]
+        parent_exists = os.path.isdir(os.path.dirname(src))
+        if entry["op"] == "move":
+            dst = entry["dst"]
+            if os.path.exists(dst) and not os.path.exists(src) and parent_exists:
+                shutil.move(dst, src)
+                restored += 1
+            elif not (os.path.exists(src) and not os.path.exists(dst)):
+                remaining = index + 1 - len([i for i in undone if i < index])
+                print(f"Warning: cannot undo move {src} -> {dst}, {remaining} journal entries left, keeping {JOURNAL_PATH}")
+                return False
+        elif entry["op"] == "rmdir":
+            if not os.path.exists(src) and parent_exists:
+                os.mkdir(src)
+                restored += 1
+            elif not os.path.isdir(src):
+                remaining = index + 1 - len([i for i in undone if i < index])
+                print(f"Warning: cannot recreate folder {src}, {remaining} journal entries left, keeping {JOURNAL_PATH}")
+                return False
+        journal_append({"op": "undone", "index": index})
+    
+    os.remove(JOURNAL_PATH)
+    print(f"Restore completed! Operations undone: {restored}")
+    return True
+
 def run_all_steps():
+    # A journal left by an interrupted run means the source tree is half moved;
+    # roll it back first so this run starts from the original structure.
+    if os.path.exists(JOURNAL_PATH):
+        print("Found journal from an interrupted run, restoring original structure first")
+        if not restore_original_structure():
+            print("Error: could not fully restore the original structure, fix it by hand using the journal")
+            return
+        time.sleep(1)
     move_pointcloud_contents()
     time.sleep(1)  
     reorganize_files()
@@ -507,7 +611,8 @@ def run_all_steps():
     time.sleep(1)  
     cleanup_intermediate_files()
     time.sleep(1)
-    restore_original_structure()
+    if not restore_original_structure():
+        print("Error: could not fully restore the original structure, fix it by hand using the journal")
     time.sleep(1)
 
 if __name__ == "__main__":
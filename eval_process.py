@@ -0,0 +1,235 @@
+"""
+Point-level and object-level evaluation on the MulSen_AD_process dataset.
+"""
+import os
+import json
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Dotted so json_process.py does not take it for a category
+CACHE_DIR_NAME = ".gt_cache"
+
+def load_test_entries(data_dir):
+    """Read test.json and group its entries by category, keeping file order"""
+    test_json_path = Path(data_dir) / "test.json"
+    entries_by_category = {}
+    index = 0
+    with open(test_json_path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            entry["index"] = index
+            index += 1
+            entries_by_category.setdefault(entry["clsname"], []).append(entry)
+    return entries_by_category
+
+def read_pcd_num_points(pcd_path):
+    """Read the point count from a PCD header without loading the points"""
+    with open(pcd_path, 'rb') as f:
+        for line in f:
+            if line.startswith(b"POINTS"):
+                return int(line.split()[1])
+            if line.startswith(b"DATA"):
+                break
+    raise ValueError(f"No POINTS field in PCD header: {pcd_path}")
+
+def load_gt_labels(gt_path):
+    """Read the label column of a GT/*.txt file (x,y,z,label per line)"""
+    labels = np.loadtxt(gt_path, delimiter=',', usecols=3, ndmin=1)
+    return labels.astype(np.uint8)
+
+def gt_source_path(data_path, entry):
+    """File the labels of a sample come from: its GT file, or its PCD for good samples"""
+    return data_path / entry["maskname"] if "maskname" in entry else data_path / entry["filename"]
+
+def source_stats(data_path, entries):
+    """Modification time and size of every label source, to detect a stale cache"""
+    stats = [os.stat(gt_source_path(data_path, entry)) for entry in entries]
+    return np.array([[st.st_mtime_ns, st.st_size] for st in stats], dtype=np.int64).reshape(-1, 2)
+
+def build_gt_cache(data_dir, entries):
+    """Concatenate the point labels of one category into a single array"""
+    data_path = Path(data_dir)
+    labels = []
+    lengths = []
+    for entry in entries:
+        if "maskname" in entry:
+            sample_labels = load_gt_labels(gt_source_path(data_path, entry))
+        else:
+            # Good samples have no GT file, every point is normal
+            num_points = read_pcd_num_points(gt_source_path(data_path, entry))
+            sample_labels = np.zeros(num_points, dtype=np.uint8)
+        if len(sample_labels) == 0:
+            raise ValueError(f"Sample has no points: {entry['filename']}")
+        labels.append(sample_labels)
+        lengths.append(len(sample_labels))
+
+    return {
+        "filenames": np.array([entry["filename"] for entry in entries]),
+        "object_labels": np.array([entry["label"] for entry in entries], dtype=np.uint8),
+        "offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        "labels": np.concatenate(labels) if labels else np.zeros(0, dtype=np.uint8),
+        "source_stats": source_stats(data_path, entries),
+    }
+
+def load_gt_cache(data_dir, clsname, entries):
+    """Load the cached labels of one category, rebuilding them if test.json or a GT file changed"""
+    data_path = Path(data_dir)
+    cache_path = data_path / CACHE_DIR_NAME / f"{clsname}.npz"
+    filenames = [entry["filename"] for entry in entries]
+
+    if cache_path.exists() and os.path.getmtime(cache_path) >= os.path.getmtime(data_path / "test.json"):
+        with np.load(cache_path) as cached:
+            cache = {key: cached[key] for key in cached.files}
+        # Only stat calls are needed to notice regenerated GT files
+        if (cache["filenames"].tolist() == filenames and "source_stats" in cache
+                and np.array_equal(cache["source_stats"], source_stats(data_path, entries))):
+            return cache
+
+    cache = build_gt_cache(data_dir, entries)
+    cache_path.parent.mkdir(exist_ok=True)
+    # Write under a temporary name first so an interrupted run never leaves a broken cache
+    tmp_path = cache_path.with_suffix(".tmp.npz")
+    np.savez(tmp_path, **cache)
+    os.replace(tmp_path, cache_path)
+    return cache
+
+def compute_auroc_aupr(labels, scores):
+    """AUROC and AUPR (average precision) from a single descending sort"""
+    labels = np.asarray(labels).astype(bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(labels) != len(scores):
+        raise ValueError(f"Got {len(scores)} scores for {len(labels)} labels")
+    num_pos = int(labels.sum())
+    num_neg = len(labels) - num_pos
+    if num_pos == 0 or num_neg == 0:
+        return float("nan"), float("nan")
+
+    order = np.argsort(scores, kind="stable")[::-1]
+    sorted_scores = scores[order]
+    sorted_labels = labels[order]
+
+    # Only the last position of each run of tied scores is a valid threshold
+    threshold_idx = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(sorted_scores) - 1]
+    tps = np.cumsum(sorted_labels, dtype=np.int64)[threshold_idx]
+    fps = threshold_idx + 1 - tps
+
+    tpr = np.r_[0.0, tps / num_pos]
+    fpr = np.r_[0.0, fps / num_neg]
+    auroc = np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)
+
+    precision = tps / (tps + fps)
+    aupr = np.sum(np.diff(tpr) * precision)
+    return float(auroc), float(aupr)
+
+def gather_scores(scores, entries, global_offsets, lengths, name):
+    """Collect the scores of one category as a single array in cache order"""
+    if isinstance(scores, dict):
+        missing = [entry["filename"] for entry in entries if entry["filename"] not in scores]
+        if missing:
+            raise KeyError(f"No {name} for {len(missing)} samples, e.g. {missing[0]}")
+        sample_scores = [np.ravel(scores[entry["filename"]]) for entry in entries]
+        sizes = np.array([len(s) for s in sample_scores])
+        mismatched = np.flatnonzero(sizes != lengths)
+        if len(mismatched):
+            i = mismatched[0]
+            raise ValueError(f"{entries[i]['filename']}: got {sizes[i]} {name}, expected {lengths[i]}")
+        return np.concatenate(sample_scores).astype(np.float64)
+
+    # Packed array laid out in test.json order
+    scores = np.ravel(scores)
+    indices = np.array([entry["index"] for entry in entries])
+    if len(indices) and np.all(np.diff(indices) == 1):
+        return scores[global_offsets[indices[0]]:global_offsets[indices[-1] + 1]].astype(np.float64)
+    return np.concatenate([scores[global_offsets[i]:global_offsets[i + 1]] for i in indices]).astype(np.float64)
+
+def evaluate_category(cache, entries, point_scores, object_scores, point_offsets, object_offsets):
+    """Compute object-level and point-level AUROC/AUPR for one category"""
+    offsets = cache["offsets"]
+    category_point_scores = gather_scores(point_scores, entries, point_offsets, np.diff(offsets), "point scores")
+    if len(category_point_scores) != offsets[-1]:
+        raise ValueError(f"{entries[0]['clsname']}: got {len(category_point_scores)} point scores, "
+                         f"expected {offsets[-1]} from GT")
+
+    if object_scores is None:
+        # Default object score is the maximum point score of each sample
+        category_object_scores = np.maximum.reduceat(category_point_scores, offsets[:-1])
+    else:
+        category_object_scores = gather_scores(object_scores, entries, object_offsets,
+                                               np.ones(len(entries), dtype=np.int64), "object scores")
+
+    object_auroc, object_aupr = compute_auroc_aupr(cache["object_labels"], category_object_scores)
+    point_auroc, point_aupr = compute_auroc_aupr(cache["labels"], category_point_scores)
+    return {
+        "object_auroc": object_auroc,
+        "object_aupr": object_aupr,
+        "point_auroc": point_auroc,
+        "point_aupr": point_aupr,
+    }
+
+def evaluate(data_dir, point_scores, object_scores=None, num_workers=None):
+    """Evaluate anomaly scores against the GT of MulSen_AD_process
+
+    point_scores is either a dict mapping each test.json filename to its
+    per-point scores, or one packed array with all samples concatenated in
+    test.json order. object_scores uses the same layout with one score per
+    sample; when omitted the maximum point score of each sample is used.
+    Returns a dict of metrics per category.
+    """
+    entries_by_category = load_test_entries(data_dir)
+
+    def load_category(clsname):
+        return clsname, load_gt_cache(data_dir, clsname, entries_by_category[clsname])
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        caches = dict(executor.map(load_category, entries_by_category))
+
+    # Global offsets of every sample in test.json order, for packed inputs
+    num_entries = sum(len(entries) for entries in entries_by_category.values())
+    lengths = np.zeros(num_entries, dtype=np.int64)
+    for clsname, entries in entries_by_category.items():
+        lengths[[entry["index"] for entry in entries]] = np.diff(caches[clsname]["offsets"])
+    point_offsets = np.concatenate([[0], np.cumsum(lengths)])
+    object_offsets = np.arange(num_entries + 1)
+
+    if not isinstance(point_scores, dict) and np.size(point_scores) != point_offsets[-1]:
+        raise ValueError(f"Packed point scores have {np.size(point_scores)} values, "
+                         f"expected {point_offsets[-1]} from GT")
+    if object_scores is not None and not isinstance(object_scores, dict) and np.size(object_scores) != num_entries:
+        raise ValueError(f"Packed object scores have {np.size(object_scores)} values, "
+                         f"expected {num_entries} samples")
+
+    def run_category(clsname):
+        return clsname, evaluate_category(caches[clsname], entries_by_category[clsname],
+                                          point_scores, object_scores, point_offsets, object_offsets)
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        results = dict(executor.map(run_category, sorted(entries_by_category)))
+    return results
+
+def print_results(results):
+    """Print per category metrics and their mean"""
+    metric_names = ["object_auroc", "object_aupr", "point_auroc", "point_aupr"]
+    print(f"{'category':<12}" + "".join(f"{name:>14}" for name in metric_names))
+    for clsname, metrics in results.items():
+        print(f"{clsname:<12}" + "".join(f"{metrics[name]:>14.4f}" for name in metric_names))
+    means = [np.nanmean([metrics[name] for metrics in results.values()]) for name in metric_names]
+    print(f"{'mean':<12}" + "".join(f"{value:>14.4f}" for value in means))
+
+if __name__ == "__main__":
+    # Change these to your MulSen_AD_processed folder and score file paths
+    data_directory = "MulSen_AD_process"
+    # .npz file with one per-point score array per test sample, keyed by its test.json filename
+    scores_path = "scores.npz"
+
+    if not os.path.exists(os.path.join(data_directory, "test.json")):
+        print(f"Error: test.json not found in {data_directory}!")
+        print("Please run json_process.py first.")
+    elif not os.path.exists(scores_path):
+        print(f"Error: Score file {scores_path} not found!")
+    else:
+        with np.load(scores_path) as score_file:
+            scores = {key: score_file[key] for key in score_file.files}
+        print_results(evaluate(data_directory, scores))
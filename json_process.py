@@ -13,8 +13,8 @@ def generate_json_metadata(data_dir):
     train_data = []
     test_data = []
     
-    # Get all category directories
-    categories = [d for d in data_path.iterdir() if d.is_dir()]
+    # Get all category directories, skipping hidden ones such as the evaluation cache
+    categories = [d for d in data_path.iterdir() if d.is_dir() and not d.name.startswith('.')]
     
     for category_dir in categories:
         category_name = category_dir.name